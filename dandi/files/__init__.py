@@ -12,15 +12,19 @@ files that can be uploaded as assets to DANDI Archive.
 from __future__ import annotations
 
 from collections import deque
-from collections.abc import Iterator
-import os.path
+from collections.abc import Generator
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+import os
 from pathlib import Path
+import queue
+import threading
 
 from dandi import get_logger
 from dandi.consts import BIDS_DATASET_DESCRIPTION, dandiset_metadata_file
 from dandi.exceptions import UnknownAssetError
 
-from ._private import BIDSFileFactory, DandiFileFactory
+from ._private import BIDSFileFactory, DandiFileFactory, DeepFileFactory
 from .bases import (
     DandiFile,
     DandisetMetadataFile,
@@ -59,18 +63,29 @@ __all__ = [
     "ZarrStat",
     "dandi_file",
     "find_dandi_files",
+    "find_dandi_files_streaming",
     "find_bids_dataset_description",
 ]
 
 lgr = get_logger()
 
+#: Default maximum number of threads used by `find_dandi_files()` to list
+#: directories
+SCAN_JOBS = 8
+
+#: Default maximum depth below the Dandiset root of directories in which BIDS
+#: :file:`dataset_description.json` files are looked for
+BIDS_SEARCH_DEPTH = 4
+
 
 def find_dandi_files(
     *paths: str | Path,
     dandiset_path: str | Path | None = None,
     allow_all: bool = False,
     include_metadata: bool = False,
-) -> Iterator[DandiFile]:
+    jobs: int | None = None,
+    bids_search_depth: int = BIDS_SEARCH_DEPTH,
+) -> Generator[DandiFile, None, None]:
     """
     Yield all DANDI files at or under the paths in ``paths`` (which may be
     either files or directories).  Files & directories whose names start with a
@@ -91,66 +106,298 @@ def find_dandi_files(
         If true, the Dandiset's :file:`dandiset.yaml` file is returned as a
         `DandisetMetadataFile` instance.  If false, it is not returned at all
         (unless ``allow_all`` is true).
+    :param jobs:
+        The maximum number of threads to use for listing directories ahead of
+        the traversal (default: `SCAN_JOBS`, i.e., 8).  Files are yielded in
+        the same order regardless of the value.
+    :param bids_search_depth:
+        The maximum depth below ``dandiset_path`` of directories in which to
+        look for BIDS :file:`dataset_description.json` files.  Directories
+        deeper than this are never treated as BIDS dataset roots, and a
+        :file:`dataset_description.json` file in one that is not already
+        inside a BIDS dataset is treated as a generic file.  Has no effect if
+        ``dandiset_path`` is `None`.
     """
 
-    # A pair of each file or directory being considered plus the most recent
-    # BIDS dataset_description.json file at the path (if a directory) or in a
-    # parent path
-    path_queue: deque[tuple[Path, BIDSDatasetDescriptionAsset | None]] = deque()
+    # Each item in the queue is either a quadruple of a file or directory
+    # being considered, its path relative to the Dandiset (or its basename if
+    # there is no Dandiset path), the factory for constructing the asset (a
+    # `BIDSFileFactory` for the most recent BIDS dataset_description.json file
+    # at the path (if a directory) or in a parent path, if any), and the
+    # `os.DirEntry` the path was obtained from (if any), which caches file type
+    # information; or else a pending listing of a directory, whose entries are
+    # processed in place of the listing once it is reached.  Paths are kept as
+    # strings until an asset is constructed in order to keep the loop fast.
+    path_queue: deque[
+        tuple[str, str, DandiFileFactory, os.DirEntry[str] | None] | _DirListing
+    ] = deque()
+    plain_factory = DandiFileFactory()
+    ds_path: Path | None = None
+    if dandiset_path is not None:
+        ds_path = Path(dandiset_path)
+        ds_root = os.path.abspath(ds_path)
+        # With a trailing path separator:
+        ds_prefix = os.path.join(ds_root, "")
     for p in map(Path, paths):
         if dandiset_path is not None:
-            try:
-                p.relative_to(dandiset_path)
-            except ValueError:
+            ap = os.path.abspath(p)
+            if ap == ds_root:
+                path = "."
+            elif ap.startswith(ds_prefix):
+                path = ap[len(ds_prefix) :].replace(os.sep, "/")
+            else:
                 raise ValueError(
                     f"Path {str(p)!r} is not inside Dandiset path {str(dandiset_path)!r}"
                 )
-        path_queue.append((Path(p), None))
-    bids_roots = []
-    while path_queue:
-        p, bidsdd = path_queue.popleft()
-        if p.name.startswith("."):
-            continue
-        if p.is_dir():
-            if p.is_symlink():
-                lgr.warning("%s: Ignoring unsupported symbolic link to directory", p)
-            elif dandiset_path is not None and p == Path(dandiset_path):
-                if os.path.lexists(p / BIDS_DATASET_DESCRIPTION):
-                    bids = dandi_file(p / BIDS_DATASET_DESCRIPTION, dandiset_path)
-                    assert isinstance(bids, BIDSDatasetDescriptionAsset)
-                    bidsdd = bids
-                    bids_roots.append(p)
-                path_queue.extend((q, bidsdd) for q in p.iterdir())
-            elif any(p.iterdir()):
-                try:
-                    df = dandi_file(p, dandiset_path, bids_dataset_description=bidsdd)
-                except UnknownAssetError:
-                    # The directory does not have a recognized file extension
-                    # (ie., it's not a Zarr or any other directory asset type
-                    # we may add later), so traverse through it as a regular
-                    # directory.
-                    if os.path.lexists(p / BIDS_DATASET_DESCRIPTION) and not any(
-                        i in p.parents for i in bids_roots
-                    ):  # No nested BIDS
-                        bids2 = dandi_file(p / BIDS_DATASET_DESCRIPTION, dandiset_path)
-                        assert isinstance(bids2, BIDSDatasetDescriptionAsset)
-                        bidsdd = bids2
-                        bids_roots.append(p)
-                    path_queue.extend((q, bidsdd) for q in p.iterdir())
+        else:
+            path = p.name
+        if not p.name.startswith("."):
+            path_queue.append((os.fspath(p), path, plain_factory, None))
+    # The directories containing the BIDS datasets found so far, each with a
+    # trailing path separator
+    bids_roots: list[str] = []
+    executor = ThreadPoolExecutor(max_workers=jobs or SCAN_JOBS)
+    try:
+        while path_queue:
+            item = path_queue.popleft()
+            if isinstance(item, _DirListing):
+                entries = item.entries.result()
+                factory = item.factory
+                if ds_path is None or item.path == ".":
+                    prefix = ""
+                else:
+                    prefix = item.path + "/"
+                if item.check_bids:
+                    bidsdd = _load_bids_dataset_description(entries, prefix, ds_path)
+                    if bidsdd is not None:
+                        factory = BIDSFileFactory(bidsdd)
+                        bids_roots.append(os.path.join(item.filepath, ""))
+                path_queue.extendleft(
+                    (e.path, prefix + e.name, factory, e) for e in reversed(entries)
+                )
+                continue
+            filepath, path, factory, entry = item
+            if entry is not None:
+                is_dir = entry.is_dir()
+            else:
+                is_dir = os.path.isdir(filepath)
+            if is_dir:
+                if (
+                    entry.is_symlink()
+                    if entry is not None
+                    else os.path.islink(filepath)
+                ):
+                    lgr.warning(
+                        "%s: Ignoring unsupported symbolic link to directory", filepath
+                    )
+                elif entry is None and ds_path is not None and path == ".":
+                    path_queue.append(
+                        _DirListing(
+                            filepath=filepath,
+                            path=path,
+                            factory=factory,
+                            check_bids=True,
+                            entries=executor.submit(_scandir, filepath),
+                        )
+                    )
+                else:
+                    try:
+                        df = _dandi_file(
+                            filepath,
+                            path,
+                            ds_path,
+                            factory,
+                            is_dir=True,
+                            is_file=False,
+                        )
+                    except UnknownAssetError:
+                        # The directory does not have a recognized file
+                        # extension (ie., it's not a Zarr or any other
+                        # directory asset type we may add later) or is an
+                        # empty Zarr, so traverse through it as a regular
+                        # directory.  (If it's empty, its listing will simply
+                        # contribute nothing.)
+                        if ds_path is not None and path.count("/") >= bids_search_depth:
+                            # Too deep for a BIDS dataset to start here
+                            check_bids = False
+                            if type(factory) is DandiFileFactory:
+                                factory = DeepFileFactory()
+                        else:
+                            # No nested BIDS
+                            check_bids = not any(
+                                filepath.startswith(r) for r in bids_roots
+                            )
+                        path_queue.append(
+                            _DirListing(
+                                filepath=filepath,
+                                path=path,
+                                factory=factory,
+                                check_bids=check_bids,
+                                entries=executor.submit(_scandir, filepath),
+                            )
+                        )
+                    else:
+                        yield df
+            else:
+                df = _dandi_file(
+                    filepath,
+                    path,
+                    ds_path,
+                    factory,
+                    is_dir=False,
+                    is_file=entry.is_file() if entry is not None else None,
+                )
+                if type(factory) is DeepFileFactory and path.endswith(
+                    "/" + BIDS_DATASET_DESCRIPTION
+                ):
+                    lgr.warning(
+                        "%s: Ignoring BIDS dataset description more than %d"
+                        " directories below the Dandiset root; files in its"
+                        " directory will not be treated as BIDS assets",
+                        filepath,
+                        bids_search_depth,
+                    )
+                # Don't use isinstance() here, as GenericBIDSAsset's should
+                # still be returned
+                if type(df) is GenericAsset and not allow_all:
+                    pass
+                elif isinstance(df, DandisetMetadataFile) and not (
+                    allow_all or include_metadata
+                ):
+                    pass
                 else:
                     yield df
-        else:
-            df = dandi_file(p, dandiset_path, bids_dataset_description=bidsdd)
-            # Don't use isinstance() here, as GenericBIDSAsset's should still
-            # be returned
-            if type(df) is GenericAsset and not allow_all:
-                pass
-            elif isinstance(df, DandisetMetadataFile) and not (
-                allow_all or include_metadata
-            ):
+    finally:
+        # If the generator is closed before being exhausted, don't bother
+        # listing the directories that haven't been reached yet
+        for item in path_queue:
+            if isinstance(item, _DirListing):
+                item.entries.cancel()
+        executor.shutdown()
+
+
+def find_dandi_files_streaming(
+    *paths: str | Path,
+    dandiset_path: str | Path | None = None,
+    allow_all: bool = False,
+    include_metadata: bool = False,
+    jobs: int | None = None,
+    bids_search_depth: int = BIDS_SEARCH_DEPTH,
+    queue_size: int = 256,
+) -> Generator[DandiFile, None, None]:
+    """
+    Like `find_dandi_files()`, but the filesystem is traversed in a background
+    thread that stays up to ``queue_size`` files ahead of the consumer, so
+    that the traversal is not paused while the caller processes each file.
+    Any exception raised by the traversal is reraised in the consumer.
+    """
+
+    results: queue.Queue[DandiFile | BaseException | None] = queue.Queue(
+        maxsize=queue_size
+    )
+    closed = threading.Event()
+
+    def put(item: DandiFile | BaseException | None) -> bool:
+        # Wait for room in the queue, but give up if the consumer goes away
+        while not closed.is_set():
+            try:
+                results.put(item, timeout=0.1)
+            except queue.Full:
                 pass
             else:
-                yield df
+                return True
+        return False
+
+    def traverse() -> None:
+        files = find_dandi_files(
+            *paths,
+            dandiset_path=dandiset_path,
+            allow_all=allow_all,
+            include_metadata=include_metadata,
+            jobs=jobs,
+            bids_search_depth=bids_search_depth,
+        )
+        # `None` if the traversal finished, or else the exception it raised
+        end: BaseException | None = None
+        try:
+            for df in files:
+                if not put(df):
+                    return
+        # Catch BaseException so that the consumer is always woken up, even if
+        # the thread dies from something like SystemExit
+        except BaseException as e:
+            end = e
+        finally:
+            files.close()
+            put(end)
+
+    thread = threading.Thread(target=traverse, name="find_dandi_files", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = results.get()
+            if item is None:
+                return
+            elif isinstance(item, BaseException):
+                raise item
+            else:
+                yield item
+    finally:
+        closed.set()
+        thread.join()
+
+
+@dataclass
+class _DirListing:
+    """A directory being listed in the background by `find_dandi_files()`"""
+
+    filepath: str
+    #: The path of the directory relative to the Dandiset (or its basename if
+    #: there is no Dandiset path)
+    path: str
+    #: The factory for constructing assets in the directory, as determined by
+    #: the most recent BIDS dataset_description.json file in a parent path
+    factory: DandiFileFactory
+    #: Whether to look for a BIDS dataset_description.json file in the
+    #: directory
+    check_bids: bool
+    entries: Future[list[os.DirEntry[str]]]
+
+
+def _scandir(dirpath: str) -> list[os.DirEntry[str]]:
+    """
+    List the entries of the directory ``dirpath`` for `find_dandi_files()`,
+    omitting those whose names start with a period.  This is run in a worker
+    thread, so the type of each entry is determined here in order for any
+    ``stat()`` calls needed to do so to happen off of the main thread; the
+    results are cached on the entries.
+    """
+    with os.scandir(dirpath) as it:
+        entries = [e for e in it if e.name[:1] != "."]
+    for e in entries:
+        if e.is_dir():
+            e.is_symlink()
+    return entries
+
+
+def _load_bids_dataset_description(
+    entries: list[os.DirEntry[str]], prefix: str, dandiset_path: Path | None
+) -> BIDSDatasetDescriptionAsset | None:
+    """
+    Return the BIDS :file:`dataset_description.json` file among the entries of
+    a directory listed by `find_dandi_files()`, if there is one.  ``prefix`` is
+    the directory's path relative to the Dandiset, with a trailing slash (or
+    the empty string if the directory is the Dandiset root or there is no
+    Dandiset path).
+    """
+    for e in entries:
+        if e.name == BIDS_DATASET_DESCRIPTION and e.is_file():
+            return BIDSDatasetDescriptionAsset(
+                filepath=Path(e.path),
+                path=prefix + e.name,
+                dandiset_path=dandiset_path,
+            )
+    return None
 
 
 def dandi_file(
@@ -186,36 +433,79 @@ def dandi_file(
             raise ValueError("Dandi file path cannot equal Dandiset path")
     else:
         path = filepath.name
-    if filepath.is_file() and path == dandiset_metadata_file:
-        return DandisetMetadataFile(filepath=filepath, dandiset_path=dandiset_path)
     if bids_dataset_description is None:
         factory = DandiFileFactory()
     else:
         factory = BIDSFileFactory(bids_dataset_description)
-    return factory(filepath, path, dandiset_path)
+    return _dandi_file(filepath, path, dandiset_path, factory)
+
+
+def _dandi_file(
+    filepath: str | Path,
+    path: str,
+    dandiset_path: Path | None,
+    factory: DandiFileFactory,
+    *,
+    is_dir: bool | None = None,
+    is_file: bool | None = None,
+) -> DandiFile:
+    """
+    Implementation of `dandi_file()` taking already-normalized arguments:
+    ``path`` is ``filepath`` relative to the Dandiset (or its basename if
+    ``dandiset_path`` is `None`), and ``factory`` is the factory for the file's
+    BIDS dataset, if any.  If ``is_dir`` and/or ``is_file`` are given (as when
+    the caller has an `os.DirEntry` for the file), they are used instead of
+    querying the filesystem for whether ``filepath`` is a directory or regular
+    file.
+    """
+    # Compare the path first so that the filesystem is only queried for
+    # dandiset.yaml
+    if path == dandiset_metadata_file and (
+        os.path.isfile(filepath) if is_file is None else is_file
+    ):
+        return DandisetMetadataFile(
+            filepath=Path(filepath), dandiset_path=dandiset_path
+        )
+    return factory(Path(filepath), path, dandiset_path, is_dir=is_dir)
 
 
 def find_bids_dataset_description(
-    dirpath: str | Path, dandiset_path: str | Path | None = None
+    dirpath: str | Path,
+    dandiset_path: str | Path | None = None,
+    bids_search_depth: int = BIDS_SEARCH_DEPTH,
 ) -> BIDSDatasetDescriptionAsset | None:
     """
     .. versionadded:: 0.46.0
 
     Look for the topmost :file:`dataset_description.json` file in the directory
     ``dirpath`` and each of its parents, stopping when a :file:`dandiset.yaml`
-    file is found or ``dandiset_path`` is reached.
+    file is found or ``dandiset_path`` is reached.  The directory at which the
+    search stopped is taken to be the root of the Dandiset, and
+    :file:`dataset_description.json` files in directories more than
+    ``bids_search_depth`` levels below it are ignored.  If ``dandiset_path`` is
+    `None`, the Dandiset root (if found) is also used as the returned asset's
+    Dandiset path.
     """
-    topmost: BIDSDatasetDescriptionAsset | None = None
+    topmost: Path | None = None
     dirpath = Path(dirpath)
+    if dandiset_path is not None:
+        dandiset_path = Path(dandiset_path)
+    root: Path | None = None
     for d in (dirpath, *dirpath.parents):
         bids_marker = d / BIDS_DATASET_DESCRIPTION
         dandi_end = d / dandiset_metadata_file
         if bids_marker.is_file() or bids_marker.is_symlink():
-            f = dandi_file(bids_marker, dandiset_path)
-            assert isinstance(f, BIDSDatasetDescriptionAsset)
-            topmost = f
-        elif dandi_end.is_file() or dandi_end.is_symlink():
-            break
-        elif dandiset_path is not None and d == Path(dandiset_path):
+            topmost = bids_marker
+        if d == dandiset_path or dandi_end.is_file() or dandi_end.is_symlink():
+            root = d
             break
-    return topmost
+    if topmost is None:
+        return None
+    if root is not None:
+        if len(topmost.parent.relative_to(root).parts) > bids_search_depth:
+            return None
+        if dandiset_path is None:
+            dandiset_path = root
+    f = dandi_file(topmost, dandiset_path)
+    assert isinstance(f, BIDSDatasetDescriptionAsset)
+    return f
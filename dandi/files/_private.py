@@ -1,8 +1,9 @@
 from __future__ import annotations
 
 from collections.abc import Mapping
-from dataclasses import dataclass
-from enum import Enum
+from dataclasses import dataclass, field
+from enum import IntEnum
+import os.path
 from pathlib import Path
 from typing import ClassVar
 import weakref
@@ -25,7 +26,7 @@ from .bids import (
 from .zarr import ZarrAsset
 
 
-class DandiFileType(Enum):
+class DandiFileType(IntEnum):
     """:meta private:"""
 
     NWB = 1
@@ -35,23 +36,30 @@ class DandiFileType(Enum):
     BIDS_DATASET_DESCRIPTION = 5
 
     @staticmethod
-    def classify(path: Path) -> DandiFileType:
-        if path.is_dir():
-            if path.suffix in ZARR_EXTENSIONS:
+    def classify(path: Path, is_dir: bool | None = None) -> DandiFileType:
+        name = path.name
+        suffix = os.path.splitext(name)[1]
+        if path.is_dir() if is_dir is None else is_dir:
+            if suffix in ZARR_EXTENSION_SET:
                 if is_empty_zarr(path):
                     raise UnknownAssetError("Empty directories cannot be Zarr assets")
                 return DandiFileType.ZARR
-            raise UnknownAssetError(
-                f"Directory has unrecognized suffix {path.suffix!r}"
-            )
-        elif path.name == BIDS_DATASET_DESCRIPTION:
+            raise UnknownAssetError(f"Directory has unrecognized suffix {suffix!r}")
+        elif name == BIDS_DATASET_DESCRIPTION:
             return DandiFileType.BIDS_DATASET_DESCRIPTION
-        elif path.suffix == ".nwb":
-            return DandiFileType.NWB
-        elif path.suffix in VIDEO_FILE_EXTENSIONS:
-            return DandiFileType.VIDEO
         else:
-            return DandiFileType.GENERIC
+            return FILE_EXTENSION_TYPES.get(suffix, DandiFileType.GENERIC)
+
+
+#: `ZARR_EXTENSIONS` as a set, for fast membership tests
+ZARR_EXTENSION_SET = frozenset(ZARR_EXTENSIONS)
+
+#: Mapping from file extensions to the types of the (non-directory) files that
+#: have them; files with other extensions are `DandiFileType.GENERIC`
+FILE_EXTENSION_TYPES: dict[str, DandiFileType] = {
+    ".nwb": DandiFileType.NWB,
+    **{ext: DandiFileType.VIDEO for ext in VIDEO_FILE_EXTENSIONS},
+}
 
 
 class DandiFileFactory:
@@ -66,19 +74,42 @@ class DandiFileFactory:
     }
 
     def __call__(
-        self, filepath: Path, path: str, dandiset_path: Path | None
+        self,
+        filepath: Path,
+        path: str,
+        dandiset_path: Path | None,
+        is_dir: bool | None = None,
     ) -> DandiFile:
-        return self.CLASSES[DandiFileType.classify(filepath)](
+        return self.CLASSES[DandiFileType.classify(filepath, is_dir)](
             filepath=filepath, path=path, dandiset_path=dandiset_path
         )
 
 
+class DeepFileFactory(DandiFileFactory):
+    """
+    :meta private:
+
+    Factory for files outside of any BIDS dataset and too deep below the
+    Dandiset root for a BIDS dataset to start in their directory, so that a
+    :file:`dataset_description.json` file there is just a generic asset
+    """
+
+    CLASSES: ClassVar[Mapping[DandiFileType, type[LocalAsset]]] = {
+        **DandiFileFactory.CLASSES,
+        DandiFileType.BIDS_DATASET_DESCRIPTION: GenericAsset,
+    }
+
+
 @dataclass
 class BIDSFileFactory(DandiFileFactory):
     """:meta private:"""
 
     bids_dataset_description: BIDSDatasetDescriptionAsset
 
+    _bids_ref: weakref.ref[BIDSDatasetDescriptionAsset] = field(
+        init=False, repr=False, compare=False
+    )
+
     CLASSES: ClassVar[Mapping[DandiFileType, type[BIDSAsset]]] = {
         DandiFileType.NWB: NWBBIDSAsset,
         DandiFileType.ZARR: ZarrBIDSAsset,
@@ -86,10 +117,18 @@ class BIDSFileFactory(DandiFileFactory):
         DandiFileType.GENERIC: GenericBIDSAsset,
     }
 
+    def __post_init__(self) -> None:
+        # Create the reference once here rather than once per asset
+        self._bids_ref = weakref.ref(self.bids_dataset_description)
+
     def __call__(
-        self, filepath: Path, path: str, dandiset_path: Path | None
+        self,
+        filepath: Path,
+        path: str,
+        dandiset_path: Path | None,
+        is_dir: bool | None = None,
     ) -> DandiFile:
-        ftype = DandiFileType.classify(filepath)
+        ftype = DandiFileType.classify(filepath, is_dir)
         if ftype is DandiFileType.BIDS_DATASET_DESCRIPTION:
             if filepath == self.bids_dataset_description.filepath:
                 return self.bids_dataset_description
@@ -99,7 +138,7 @@ class BIDSFileFactory(DandiFileFactory):
             filepath=filepath,
             path=path,
             dandiset_path=dandiset_path,
-            bids_dataset_description_ref=weakref.ref(self.bids_dataset_description),
+            bids_dataset_description_ref=self._bids_ref,
         )
         self.bids_dataset_description.dataset_files.append(df)
         return df
@@ -21,7 +21,6 @@ from ..pynwb_utils import (
     metadata_cache,
     nwb_has_external_links,
 )
-from ..utils import find_parent_directory_containing
 
 lgr = get_logger()
 
@@ -59,12 +58,9 @@ def get_metadata(
         # Is the data BIDS (as defined by the presence of a BIDS dataset descriptor)
         bids_dataset_description = find_bids_dataset_description(r.filepath)
         if bids_dataset_description:
-            dandiset_path = find_parent_directory_containing(
-                "dandiset.yaml", r.filepath
-            )
             df = dandi_file(
                 r.filepath,
-                dandiset_path,
+                bids_dataset_description.dandiset_path,
                 bids_dataset_description=bids_dataset_description,
             )
             assert isinstance(df, bids.BIDSAsset)
@@ -1,9 +1,12 @@
 from __future__ import annotations
 
-from operator import attrgetter
+from collections.abc import Iterator
+import logging
+from operator import attrgetter, itemgetter
 import os
 from pathlib import Path
 import subprocess
+from typing import Any
 from unittest.mock import ANY
 
 from dandischema.models import get_schema_version
@@ -17,7 +20,9 @@ from ..consts import ZARR_MIME_TYPE, dandiset_metadata_file
 from ..dandiapi import AssetType, RemoteZarrAsset
 from ..exceptions import UnknownAssetError
 from ..files import (
+    BIDSAsset,
     BIDSDatasetDescriptionAsset,
+    DandiFile,
     DandisetMetadataFile,
     GenericAsset,
     GenericBIDSAsset,
@@ -27,7 +32,9 @@ from ..files import (
     ZarrAsset,
     ZarrBIDSAsset,
     dandi_file,
+    find_bids_dataset_description,
     find_dandi_files,
+    find_dandi_files_streaming,
 )
 
 lgr = get_logger()
@@ -173,6 +180,191 @@ def test_find_dandi_files(tmp_path: Path) -> None:
     ]
 
 
+def test_find_dandi_files_outside_dandiset(tmp_path: Path) -> None:
+    mkpaths(tmp_path, "dandiset/sample01.nwb", "other/sample02.nwb")
+    with pytest.raises(ValueError) as excinfo:
+        list(
+            find_dandi_files(
+                tmp_path / "dandiset" / ".." / "other",
+                dandiset_path=tmp_path / "dandiset",
+            )
+        )
+    assert str(excinfo.value) == (
+        f"Path {str(tmp_path / 'dandiset' / '..' / 'other')!r} is not inside"
+        f" Dandiset path {str(tmp_path / 'dandiset')!r}"
+    )
+
+
+def test_find_dandi_files_jobs(tmp_path: Path) -> None:
+    mkpaths(
+        tmp_path,
+        dandiset_metadata_file,
+        *(
+            f"sub-{i:02d}/ses-{j}/data{k}.nwb"
+            for i in range(8)
+            for j in "ab"
+            for k in "12"
+        ),
+    )
+    serial = list(find_dandi_files(tmp_path, dandiset_path=tmp_path, jobs=1))
+    assert len(serial) == 32
+    assert list(find_dandi_files(tmp_path, dandiset_path=tmp_path, jobs=8)) == serial
+    files = find_dandi_files(tmp_path, dandiset_path=tmp_path)
+    assert next(files) in serial
+    files.close()
+
+
+def test_find_dandi_files_jobs_bids(tmp_path: Path) -> None:
+    mkpaths(
+        tmp_path,
+        dandiset_metadata_file,
+        "foo.txt",
+        "bar.nwb",
+        "bids1/dataset_description.json",
+        *(f"bids1/sub-{i:02d}/ses-{j}/data.nwb" for i in range(4) for j in "ab"),
+        "bids1/sub-00/sub.json",
+        "bids2/dataset_description.json",
+        "bids2/movie.mp4",
+        "bids2/subbids/dataset_description.json",
+        "bids2/subbids/sub-01/data.nwb",
+        "bids2/subbids/sub-01/data.json",
+        "plain/sub-01/data.nwb",
+    )
+
+    def summarize(jobs: int) -> list[tuple[type[DandiFile], str, str | None]]:
+        summary: list[tuple[type[DandiFile], str, str | None]] = []
+        for df in find_dandi_files(tmp_path, dandiset_path=tmp_path, jobs=jobs):
+            bidsdd: BIDSDatasetDescriptionAsset | None
+            if isinstance(df, BIDSDatasetDescriptionAsset):
+                bidsdd = df
+            elif isinstance(df, BIDSAsset):
+                bidsdd = df.bids_dataset_description
+            else:
+                bidsdd = None
+            summary.append(
+                (type(df), df.path, bidsdd.path if bidsdd is not None else None)
+            )
+        return summary
+
+    serial = summarize(1)
+    assert sorted(serial, key=itemgetter(1)) == sorted(
+        [
+            (NWBAsset, "bar.nwb", None),
+            (
+                BIDSDatasetDescriptionAsset,
+                "bids1/dataset_description.json",
+                "bids1/dataset_description.json",
+            ),
+            *(
+                (NWBBIDSAsset, f"bids1/sub-{i:02d}/ses-{j}/data.nwb", ANY)
+                for i in range(4)
+                for j in "ab"
+            ),
+            (GenericBIDSAsset, "bids1/sub-00/sub.json", ANY),
+            (
+                BIDSDatasetDescriptionAsset,
+                "bids2/dataset_description.json",
+                "bids2/dataset_description.json",
+            ),
+            (GenericBIDSAsset, "bids2/movie.mp4", ANY),
+            (
+                GenericBIDSAsset,
+                "bids2/subbids/dataset_description.json",
+                "bids2/dataset_description.json",
+            ),
+            (
+                GenericBIDSAsset,
+                "bids2/subbids/sub-01/data.json",
+                "bids2/dataset_description.json",
+            ),
+            (
+                NWBBIDSAsset,
+                "bids2/subbids/sub-01/data.nwb",
+                "bids2/dataset_description.json",
+            ),
+            (NWBAsset, "plain/sub-01/data.nwb", None),
+        ],
+        key=itemgetter(1),
+    )
+    for _, path, bidsdd in serial:
+        if path.startswith("bids1/"):
+            assert bidsdd == "bids1/dataset_description.json"
+        elif path.startswith("bids2/"):
+            assert bidsdd == "bids2/dataset_description.json"
+    assert summarize(8) == serial
+
+    # With a BIDS dataset at the Dandiset root, everything belongs to it
+    (tmp_path / "dataset_description.json").touch()
+    serial = summarize(1)
+    assert len(serial) == 19
+    assert {bidsdd for _, _, bidsdd in serial} == {"dataset_description.json"}
+    assert summarize(8) == serial
+
+
+def test_find_dandi_files_streaming(tmp_path: Path) -> None:
+    mkpaths(
+        tmp_path,
+        dandiset_metadata_file,
+        *(f"sub-{i:02d}/ses-{j}/data.nwb" for i in range(8) for j in "ab"),
+    )
+    expected = list(find_dandi_files(tmp_path, dandiset_path=tmp_path))
+    assert len(expected) == 16
+    assert (
+        list(find_dandi_files_streaming(tmp_path, dandiset_path=tmp_path, queue_size=2))
+        == expected
+    )
+    files = find_dandi_files_streaming(tmp_path, dandiset_path=tmp_path, queue_size=1)
+    assert next(files) in expected
+    files.close()
+    with pytest.raises(ValueError):
+        list(
+            find_dandi_files_streaming(
+                tmp_path / "sub-00", dandiset_path=tmp_path / "sub-01"
+            )
+        )
+
+
+def test_find_dandi_files_streaming_base_exception(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    def interrupted(*_args: Any, **_kwargs: Any) -> Iterator[DandiFile]:
+        yield from ()
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr("dandi.files.find_dandi_files", interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        list(find_dandi_files_streaming("."))
+
+
+def test_find_dandi_files_symlinks(tmp_path: Path) -> None:
+    mkpaths(
+        tmp_path,
+        dandiset_metadata_file,
+        "real/sample01.nwb",
+        "outside/sample02.nwb",
+    )
+    (tmp_path / "linked").symlink_to(tmp_path / "outside", target_is_directory=True)
+    (tmp_path / "linked.nwb").symlink_to(tmp_path / "real" / "sample01.nwb")
+    files = sorted(
+        find_dandi_files(tmp_path, dandiset_path=tmp_path), key=attrgetter("filepath")
+    )
+    assert files == [
+        NWBAsset(
+            filepath=tmp_path / "linked.nwb", path="linked.nwb", dandiset_path=tmp_path
+        ),
+        NWBAsset(
+            filepath=tmp_path / "outside" / "sample02.nwb",
+            path="outside/sample02.nwb",
+            dandiset_path=tmp_path,
+        ),
+        NWBAsset(
+            filepath=tmp_path / "real" / "sample01.nwb",
+            path="real/sample01.nwb",
+            dandiset_path=tmp_path,
+        ),
+    ]
+
+
 def test_find_dandi_files_with_bids(tmp_path: Path) -> None:
     mkpaths(
         tmp_path,
@@ -297,6 +489,96 @@ def test_find_dandi_files_with_bids(tmp_path: Path) -> None:
         assert asset.bids_dataset_description is bidsdd
 
 
+def test_find_dandi_files_bids_search_depth(
+    caplog: pytest.LogCaptureFixture, tmp_path: Path
+) -> None:
+    mkpaths(
+        tmp_path,
+        dandiset_metadata_file,
+        "a/b/bids/dataset_description.json",
+        "a/b/bids/file.txt",
+    )
+    files = sorted(
+        find_dandi_files(tmp_path, dandiset_path=tmp_path, allow_all=True),
+        key=attrgetter("filepath"),
+    )
+    assert [type(df) for df in files] == [
+        BIDSDatasetDescriptionAsset,
+        GenericBIDSAsset,
+        DandisetMetadataFile,
+    ]
+    files = sorted(
+        find_dandi_files(
+            tmp_path, dandiset_path=tmp_path, allow_all=True, bids_search_depth=2
+        ),
+        key=attrgetter("filepath"),
+    )
+    assert [type(df) for df in files] == [
+        GenericAsset,
+        GenericAsset,
+        DandisetMetadataFile,
+    ]
+    assert (
+        "dandi",
+        logging.WARNING,
+        f"{tmp_path / 'a' / 'b' / 'bids' / 'dataset_description.json'}: Ignoring"
+        " BIDS dataset description more than 2 directories below the Dandiset"
+        " root; files in its directory will not be treated as BIDS assets",
+    ) in caplog.record_tuples
+    assert find_bids_dataset_description(
+        tmp_path / "a" / "b" / "bids" / "file.txt", dandiset_path=tmp_path
+    ) == BIDSDatasetDescriptionAsset(
+        filepath=tmp_path / "a" / "b" / "bids" / "dataset_description.json",
+        path="a/b/bids/dataset_description.json",
+        dandiset_path=tmp_path,
+    )
+    assert (
+        find_bids_dataset_description(
+            tmp_path / "a" / "b" / "bids" / "file.txt",
+            dandiset_path=tmp_path,
+            bids_search_depth=2,
+        )
+        is None
+    )
+    assert (
+        find_bids_dataset_description(
+            tmp_path / "a" / "b" / "bids" / "file.txt", bids_search_depth=2
+        )
+        is None
+    )
+
+
+def test_find_bids_dataset_description(tmp_path: Path) -> None:
+    mkpaths(
+        tmp_path,
+        dandiset_metadata_file,
+        "foo.txt",
+        "bids1/dataset_description.json",
+        "bids1/subbids/dataset_description.json",
+        "bids1/subbids/sub-01/data.nwb",
+    )
+    assert find_bids_dataset_description(tmp_path / "foo.txt") is None
+    for p in ["bids1", "bids1/subbids", "bids1/subbids/sub-01/data.nwb"]:
+        bidsdd = find_bids_dataset_description(tmp_path / p, dandiset_path=tmp_path)
+        assert bidsdd == BIDSDatasetDescriptionAsset(
+            filepath=tmp_path / "bids1" / "dataset_description.json",
+            path="bids1/dataset_description.json",
+            dandiset_path=tmp_path,
+        )
+
+
+def test_find_bids_dataset_description_new_file(tmp_path: Path) -> None:
+    mkpaths(tmp_path, dandiset_metadata_file, "sub-01/data.nwb")
+    nwb = tmp_path / "sub-01" / "data.nwb"
+    assert find_bids_dataset_description(nwb) is None
+    (tmp_path / "dataset_description.json").touch()
+    assert find_bids_dataset_description(nwb) == BIDSDatasetDescriptionAsset(
+        filepath=tmp_path / "dataset_description.json",
+        path="dataset_description.json",
+        dandiset_path=tmp_path,
+    )
+
+
 # This test sometimes fails and sometimes passes when running on NFS.
 @pytest.mark.flaky(reruns=10)
 def test_dandi_file_zarr_with_excluded_dotfiles(tmp_path: Path) -> None: